@@ -1,10 +1,31 @@
 # main.py
 
+import os
 import sys
+import json
+import math
+import base64
+import time
+import zlib
+import hashlib
 import random
+import signal
+import argparse
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # keep stdout clean for raw frame export
 import pygame
 
+try:
+    import numpy as np
+except ImportError:  # particles are cosmetic: the game runs without them
+    np = None
+
 # =============================
 # CONFIG
 # =============================
@@ -97,6 +118,74 @@ INVULN_TIME = 0.55
 # Level transition
 LEVEL_BANNER_TIME = 2.2  # seconds
 
+# Snapshots / rewind
+SNAPSHOT_VERSION = 1
+SNAPSHOT_EVERY_TICKS = 10     # one snapshot every N gameplay ticks
+REWIND_BUFFER_SIZE = 360      # snapshots kept (360 * 10 ticks = ~60 s at 60 FPS)
+QUICKSAVE_PATH = Path("quicksave.snap")
+
+# Replays (per-frame dt + input bits, replayed against the same seed)
+REPLAY_VERSION = 5  # bump whenever simulation results change (2: swept projectiles, 3: full-width walls, 4: stress tuning, 5: dt clamp)
+INPUT_UP = 1
+INPUT_DOWN = 2
+INPUT_SHOOT = 4
+INPUT_REWIND = 8
+INPUT_RESTART = 16
+
+# Frame export
+EXPORT_MAX_PENDING_PER_WORKER = 4
+
+# Longest simulated frame: stalls are clamped to max(FRAME_DT_MAX, 2 frames at the fps cap),
+# the same way while playing, recording and replaying
+FRAME_DT_MAX = 0.25
+
+# Replay verification (leaderboard submissions)
+VERIFY_DT_MIN_FRAMES = 0.5  # frames shorter than this share of 1/fps (the replay's cap) = slow motion
+VERIFY_FPS_ALLOWED = (60,)  # the submission states its own cap, so a higher one would just lower the floor
+# everything new_replay() writes for a fresh game; start_snapshot (or anything else) is rejected
+VERIFY_REPLAY_KEYS = {"version", "seed", "fps", "stress", "stress_fire", "frames"}
+VERIFY_TIMEOUT = 30.0       # seconds of wall time per replay
+VERIFY_HOST = "127.0.0.1"
+VERIFY_PORT = 8765
+VERIFY_MAX_BODY = 64 * 1024 * 1024
+
+# Particles (needs numpy; skipped when it's not installed)
+PARTICLE_CAPACITY = 12000   # ~4 ms to draw a full pool (vectorized blend), leaves room in a 60 FPS frame
+PARTICLE_FADE_STEPS = 4
+# kind: color, size px, speed min/max (px/s), life min/max (s), drag (velocity kept per second)
+PARTICLE_KINDS = {
+    "debris": ((150, 130, 115), 3, 40, 190, 0.6, 1.4, 0.35),
+    "spark": ((255, 200, 90), 2, 120, 420, 0.15, 0.45, 0.10),
+    "wall_spark": ((255, 150, 60), 2, 90, 300, 0.10, 0.30, 0.05),
+    "impact": ((190, 240, 255), 2, 60, 240, 0.08, 0.22, 0.10),
+}
+PARTICLES_PLANET_DEBRIS = 60
+PARTICLES_PLANET_SPARKS = 30
+PARTICLES_UFO_DEBRIS = 45
+PARTICLES_UFO_SPARKS = 60
+PARTICLES_ASTEROID_SPARKS = 25
+PARTICLES_IMPACT = 12
+PARTICLES_WALL_SCRAPE = 6  # per frame while pushed back
+
+# Memory accounting (bytes; caches evict least-recently-used entries past their budget)
+MEM_BUDGET_ASTEROID_FRAMES = 1792 * 1024  # every height in ASTEROID_SCALE_H_MIN..MAX (~1603 KiB): no evictions in play
+MEM_BUDGET_TEXT = 256 * 1024
+MEM_BUDGET_REWIND = 2048 * 1024   # all REWIND_BUFFER_SIZE snapshots of normal play (4.0-4.5 KB each); stress mode hits it first
+MEM_OVERLAY_KEY = pygame.K_F3
+
+# Pixel-check scenarios: scenario i starts on reaching SCENARIO_LEVELS[i] (cycled); the warm-up
+# to get there is simulated without drawing, SCENARIO_WARMUP_CHUNK frames at a time
+SCENARIO_LEVELS = (2, 3, 4)
+SCENARIO_WARMUP_CHUNK = 240
+SCENARIO_DT = 1.0 / 60  # fixed step: --fps may be 0 (uncapped)
+
+# Rendering ("batched" = one Surface.blits per frame for the world, "reference" = original per-sprite draw)
+RENDERERS = ("batched", "reference")
+
+# Stress mode: spawn rates scaled up (gaps scaled down) by N, UFO fire rate by N * fire (see StressTuning)
+STRESS_DEFAULT = 10
+STRESS_FIRE_DEFAULT = 8.0
+
 
 # =============================
 # LEVEL SYSTEM
@@ -175,6 +264,379 @@ def clamp(v, a, b):
     return max(a, min(b, v))
 
 
+# =============================
+# MEMORY ACCOUNTING
+# =============================
+def surface_bytes(obj) -> int:
+    # pixel storage of a surface, or of every surface in a list / tuple
+    if isinstance(obj, (list, tuple)):
+        return sum(surface_bytes(o) for o in obj)
+    return obj.get_pitch() * obj.get_height()
+
+
+def entity_pool_bytes(entities) -> int:
+    # shallow size of an entity list and its dicts (shared surfaces are counted as assets / caches)
+    return sys.getsizeof(entities) + sum(sys.getsizeof(e) for e in entities)
+
+
+class SurfaceCache:
+    """LRU cache of surfaces (or lists of surfaces) that knows how many bytes it holds.
+
+    Past budget bytes the least recently used entries are evicted; entities that
+    still reference an evicted value keep it alive until they're gone.
+    """
+
+    def __init__(self, budget=None):
+        self.budget = budget
+        self.entries = OrderedDict()  # key -> (value, bytes)
+        self.nbytes = 0
+        self.evictions = 0
+
+    def get(self, key, make):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            return entry[0]
+        value = make()
+        size = surface_bytes(value)
+        self.entries[key] = (value, size)
+        self.nbytes += size
+        while self.budget is not None and self.nbytes > self.budget and len(self.entries) > 1:
+            _, (_, old_size) = self.entries.popitem(last=False)
+            self.nbytes -= old_size
+            self.evictions += 1
+        return value
+
+
+def draw_memory_overlay(screen: pygame.Surface, font, report: dict):
+    lines = []
+    for section, items in report.items():
+        total = sum(v["bytes"] for v in items.values())
+        lines.append((f"{section}: {total / 1024:.0f} KB", (255, 230, 140)))
+        for name, v in sorted(items.items(), key=lambda kv: -kv[1]["bytes"]):
+            budget = f" / {v['budget'] / 1024:.0f} KB" if v.get("budget") else ""
+            evicted = f"  ({v['evictions']} evicted)" if v.get("evictions") else ""
+            lines.append((f"  {name}: {v['bytes'] / 1024:.1f} KB{budget}{evicted}", (220, 220, 220)))
+
+    line_h = font.get_linesize()
+    panel = pygame.Surface((380, line_h * len(lines) + 12), pygame.SRCALPHA)
+    panel.fill((0, 0, 0, 190))
+    for i, (text, color) in enumerate(lines):
+        panel.blit(font.render(text, True, color), (8, 6 + i * line_h))
+    screen.blit(panel, (SCREEN_W - panel.get_width() - 10, 10))
+
+
+def swept_hit(rect: pygame.Rect, dx: float, dy: float, target: pygame.Rect):
+    """Earliest t in [0, 1] at which rect, having moved by (dx, dy) this frame, touched target.
+
+    (dx, dy) is the motion relative to target. Segment-vs-AABB slab test on the
+    Minkowski sum, so fast projectiles can't skip over small targets; at t = 1
+    it agrees with rect.colliderect(target). Returns None on a miss.
+    """
+    t_min, t_max = 0.0, 1.0
+    for end, d, lo, hi in (
+        (rect.left, dx, target.left - rect.width + 1, target.right),
+        (rect.top, dy, target.top - rect.height + 1, target.bottom),
+    ):
+        start = end - d
+        if d == 0:
+            if not lo <= start < hi:
+                return None
+            continue
+        ta = (lo - start) / d
+        tb = (hi - start) / d
+        if ta > tb:
+            ta, tb = tb, ta
+        t_min = max(t_min, ta)
+        t_max = min(t_max, tb)
+        if t_min > t_max + 1e-9:  # tolerance: an end position exactly on lo must still count
+            return None
+    return min(t_min, 1.0)
+
+
+# =============================
+# SNAPSHOTS (save / restore / rewind)
+# =============================
+def encode_snapshot(state: dict) -> bytes:
+    # state holds only plain values (no Surfaces / Rects), so JSON + zlib keeps it to a few KB
+    state = dict(state, version=SNAPSHOT_VERSION)
+    return zlib.compress(json.dumps(state, separators=(",", ":")).encode("utf-8"), 6)
+
+
+def decode_snapshot(blob: bytes) -> dict:
+    state = json.loads(zlib.decompress(blob).decode("utf-8"))
+    if state.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version: {state.get('version')}")
+    return state
+
+
+def save_snapshot(path: Path, blob: bytes):
+    path.write_bytes(blob)
+
+
+def load_snapshot(path: Path) -> bytes:
+    if not path.exists():
+        raise FileNotFoundError(f"Missing file: {path}")
+    return path.read_bytes()
+
+
+def rng_state_to_json(state):
+    version, internal, gauss_next = state
+    return [version, list(internal), gauss_next]
+
+
+def rng_state_from_json(state):
+    version, internal, gauss_next = state
+    return version, tuple(internal), gauss_next
+
+
+# =============================
+# REPLAYS
+# =============================
+def max_frame_dt(fps: int) -> float:
+    return max(FRAME_DT_MAX, 2.0 / fps) if fps > 0 else FRAME_DT_MAX
+
+
+def new_replay(seed: int, start_snapshot=None, stress=None) -> dict:
+    stress = stress if stress is not None else StressTuning()
+    replay = {"version": REPLAY_VERSION, "seed": seed, "fps": FPS, "stress": stress.mult, "stress_fire": stress.fire,
+              "frames": []}
+    if start_snapshot is not None:
+        # a replay that didn't start from a fresh game carries its starting state
+        replay["start_snapshot"] = base64.b64encode(start_snapshot).decode("ascii")
+    return replay
+
+
+def replay_start_snapshot(replay: dict):
+    blob = replay.get("start_snapshot")
+    return base64.b64decode(blob) if blob is not None else None
+
+
+def save_replay(path: Path, replay: dict):
+    path.write_text(json.dumps(replay, separators=(",", ":")), encoding="utf-8")
+
+
+def load_replay(path: Path) -> dict:
+    if not path.exists():
+        raise FileNotFoundError(f"Missing file: {path}")
+    replay = json.loads(path.read_text(encoding="utf-8"))
+    if replay.get("version") != REPLAY_VERSION:
+        raise ValueError(f"Unsupported replay version: {replay.get('version')}")
+    return replay
+
+
+def keys_to_input_bits(keys, restart_pressed: bool) -> int:
+    bits = 0
+    if keys[pygame.K_UP]:
+        bits |= INPUT_UP
+    if keys[pygame.K_DOWN]:
+        bits |= INPUT_DOWN
+    if keys[pygame.K_SPACE]:
+        bits |= INPUT_SHOOT
+    if keys[pygame.K_BACKSPACE]:
+        bits |= INPUT_REWIND
+    if restart_pressed:
+        bits |= INPUT_RESTART
+    return bits
+
+
+# =============================
+# FRAME EXPORT (headless replays -> raw RGB pipe / PNG sequence)
+# =============================
+def _write_png_frame(path: str, data: bytes, size):
+    # runs in a worker process
+    pygame.image.save(pygame.image.frombuffer(data, size, "RGB"), path)
+    return path
+
+
+def export_target_kind(target: str) -> str:
+    """"stdout", "dir" (numbered PNGs) or "raw" (RGB24 file / pipe); ValueError if target is ambiguous."""
+    path = Path(target)
+    if target == "-":
+        return "stdout"
+    if target.endswith(("/", os.sep)) or path.is_dir():
+        return "dir"
+    if path.exists() or path.suffix:
+        if not path.parent.is_dir():
+            raise ValueError(f"directory {path.parent} does not exist")
+        return "raw"
+    raise ValueError(f"'{target}' doesn't exist: use '{target}/' for a PNG directory "
+                     f"or a file name with an extension (e.g. '{target}.rgb') for raw RGB24")
+
+
+class FrameExporter:
+    """Streams rendered frames out without blocking the game loop.
+
+    target "-" writes raw RGB24 to stdout, a directory (existing, or ending in
+    "/" and created) writes numbered PNGs encoded on a process pool, and a file
+    / named pipe gets raw RGB24. See export_target_kind().
+    """
+
+    def __init__(self, target: str, workers: int = 0):
+        self.count = 0
+        self.pending = deque()
+        self.out = None
+        kind = export_target_kind(target)
+        if kind == "dir":
+            self.dir = Path(target)
+            self.dir.mkdir(parents=True, exist_ok=True)
+            workers = workers or os.cpu_count() or 1
+            self.pool = ProcessPoolExecutor(max_workers=workers)
+        else:
+            self.dir = None
+            workers = 1  # raw frames must stay in order: a single writer thread
+            self.out = sys.stdout.buffer if kind == "stdout" else open(target, "wb")
+            self.pool = ThreadPoolExecutor(max_workers=1)
+        self.max_pending = workers * EXPORT_MAX_PENDING_PER_WORKER
+
+    def submit(self, screen: pygame.Surface):
+        data = pygame.image.tobytes(screen, "RGB")
+        if self.dir is not None:
+            path = str(self.dir / f"frame_{self.count:06d}.png")
+            fut = self.pool.submit(_write_png_frame, path, data, screen.get_size())
+        else:
+            fut = self.pool.submit(self.out.write, data)
+        self.pending.append(fut)
+        self.count += 1
+
+        # backpressure: don't let queued frames pile up in memory
+        while len(self.pending) > self.max_pending:
+            self.pending.popleft().result()
+
+    def close(self):
+        while self.pending:
+            self.pending.popleft().result()
+        self.pool.shutdown()
+        if self.out is not None:
+            self.out.flush()
+            if self.out is not sys.stdout.buffer:
+                self.out.close()
+
+
+# =============================
+# PARTICLES
+# =============================
+class ParticleSystem:
+    """Fixed-capacity particle pool stored in NumPy arrays.
+
+    update() integrates, ages and compacts every live particle in one vectorized
+    pass; draw() blends them all into the frame with a few fancy-indexed writes.
+    """
+
+    def __init__(self, capacity: int, seed: int):
+        self.capacity = capacity
+        self.count = 0
+        self.pos = np.zeros((capacity, 2), dtype=np.float32)
+        self.vel = np.zeros((capacity, 2), dtype=np.float32)
+        self.age = np.zeros(capacity, dtype=np.float32)
+        self.life = np.ones(capacity, dtype=np.float32)
+        self.kind = np.zeros(capacity, dtype=np.int8)
+        # separate generator: particles must never consume the gameplay RNG (replays stay deterministic)
+        self.rng = np.random.default_rng(seed)
+
+        self.kind_ids = {name: i for i, name in enumerate(PARTICLE_KINDS)}
+        self.kind_drag = np.array([k[6] for k in PARTICLE_KINDS.values()], dtype=np.float32)
+
+        # per (kind, fade step) bucket: color, alpha and the pixel offsets of its size x size square
+        self.buckets = []
+        for color, size, *_ in PARTICLE_KINDS.values():
+            dx, dy = np.meshgrid(np.arange(size) - size // 2, np.arange(size) - size // 2)
+            for step in range(PARTICLE_FADE_STEPS):
+                alpha = 255 - step * (255 // PARTICLE_FADE_STEPS)
+                self.buckets.append((color, alpha, dx.ravel(), dy.ravel()))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(arr.nbytes for arr in (self.pos, self.vel, self.age, self.life, self.kind))
+
+    def clear(self):
+        self.count = 0
+
+    def emit(self, kind: str, x: float, y: float, n: int, direction=None, spread=math.pi):
+        """Burst of n particles at (x, y); direction (radians) + spread narrow the cone."""
+        n = min(n, self.capacity - self.count)
+        if n <= 0:
+            return
+        _, _, v_min, v_max, life_min, life_max, _ = PARTICLE_KINDS[kind]
+        i0, i1 = self.count, self.count + n
+        base = 0.0 if direction is None else direction
+        ang = base + self.rng.uniform(-spread, spread, n)
+        spd = self.rng.uniform(v_min, v_max, n)
+        self.pos[i0:i1, 0] = x
+        self.pos[i0:i1, 1] = y
+        self.vel[i0:i1, 0] = np.cos(ang) * spd
+        self.vel[i0:i1, 1] = np.sin(ang) * spd
+        self.age[i0:i1] = 0.0
+        self.life[i0:i1] = self.rng.uniform(life_min, life_max, n)
+        self.kind[i0:i1] = self.kind_ids[kind]
+        self.count = i1
+
+    def update(self, dt: float, scroll_dx: float):
+        n = self.count
+        if n == 0:
+            return
+        pos, vel, age = self.pos[:n], self.vel[:n], self.age[:n]
+        age += dt
+        pos += vel * dt
+        pos[:, 0] -= scroll_dx
+        vel *= (self.kind_drag[self.kind[:n]] ** dt)[:, None]
+
+        alive = (age < self.life[:n]) & (pos[:, 0] > -20) & (pos[:, 0] < SCREEN_W + 20)
+        alive_n = int(alive.sum())
+        if alive_n != n:
+            for arr in (self.pos, self.vel, self.age, self.life, self.kind):
+                arr[:alive_n] = arr[:n][alive]
+            self.count = alive_n
+
+    def draw(self, screen: pygame.Surface):
+        """Alpha-blend every particle straight into the frame's pixels, one vectorized write per bucket.
+
+        Overlapping particles of the same bucket don't stack (the last write wins).
+        """
+        n = self.count
+        if n == 0:
+            return
+        fade = np.minimum((self.age[:n] / self.life[:n] * PARTICLE_FADE_STEPS).astype(np.int32), PARTICLE_FADE_STEPS - 1)
+        bucket = self.kind[:n].astype(np.int32) * PARTICLE_FADE_STEPS + fade
+        order = np.argsort(bucket, kind="stable")
+        counts = np.bincount(bucket, minlength=len(self.buckets)).tolist()
+        xs = self.pos[:n, 0].astype(np.int32)[order]
+        ys = self.pos[:n, 1].astype(np.int32)[order]
+
+        w, h = screen.get_size()
+        # 32-bit xRGB / xBGR frames: blend red+blue and green as packed words (~4x faster than pixels3d)
+        packed = screen.get_bytesize() == 4 and screen.get_masks()[1] == 0xFF00
+        if packed:
+            buf = screen.get_buffer()  # locks the surface until released
+            pixels = np.frombuffer(buf, dtype=np.uint32)
+            stride = screen.get_pitch() // 4
+        else:
+            pixels = pygame.surfarray.pixels3d(screen)  # (w, h, 3) view, surface locked until del
+        start = 0
+        for (color, alpha, dx, dy), cnt in zip(self.buckets, counts):
+            if cnt == 0:
+                continue
+            px = (xs[start:start + cnt, None] + dx).ravel()
+            py = (ys[start:start + cnt, None] + dy).ravel()
+            start += cnt
+            inside = (px >= 0) & (px < w) & (py >= 0) & (py < h)
+            px, py = px[inside], py[inside]
+            if packed:
+                idx = py * stride + px
+                dst = pixels[idx]
+                src = np.uint32(screen.map_rgb(color))
+                a, ia = np.uint32(alpha), np.uint32(256 - alpha)
+                rb = (((dst & 0xFF00FF) * ia + (src & 0xFF00FF) * a) >> 8) & 0xFF00FF
+                g = (((dst & 0xFF00) * ia + (src & 0xFF00) * a) >> 8) & 0xFF00
+                pixels[idx] = rb | g | (dst & 0xFF000000)
+            else:
+                dst = pixels[px, py].astype(np.int32)
+                pixels[px, py] = dst + (np.array(color, dtype=np.int32) - dst) * alpha // 255
+        del pixels
+        if packed:
+            del buf
+
+
 # =============================
 # TUNNEL LOGIC
 # =============================
@@ -195,10 +657,89 @@ def next_tunnel_params(center_row: int, corridor_h: int, rows_in_blocks: int, dr
     return center_row, corridor_h
 
 
-def corridor_bounds_px_for_x(tunnel_cols, tunnel_scroll_x, screen_x: float):
-    col_idx = int((screen_x + tunnel_scroll_x) // BLOCK)
-    col_idx = clamp(col_idx, 0, len(tunnel_cols) - 1)
-    top, bottom = tunnel_cols[col_idx]
+class CorridorSpans:
+    """The tunnel's (top, bottom) columns plus corridor bounds over x-spans of them.
+
+    Columns go in with append() and scroll out with popleft(); indexing,
+    len() and iteration read them like a list. For every width k a pair of
+    monotonic deques yields the newest k-wide window in amortized O(1) per
+    appended column; the results are kept per window start, so any span
+    query up to max_span columns is a lookup.
+    """
+
+    def __init__(self, max_span: int):
+        self.max_span = max(1, max_span)
+        self.clear()
+
+    def clear(self):
+        self.base = 0   # absolute index of self.cols[0]
+        self.next = 0   # absolute index of the next appended column
+        self.cols = deque()
+        ks = range(self.max_span + 1)  # index 0 unused
+        self.top_q = [deque() for _ in ks]     # (abs index, top), tops decreasing
+        self.bot_q = [deque() for _ in ks]     # (abs index, bottom), bottoms increasing
+        self.windows = [deque() for _ in ks]   # (max top, min bottom) per window start
+        self.win_start = [0 for _ in ks]       # absolute start index of windows[k][0]
+
+    def append(self, col):
+        top, bottom = col
+        i = self.next
+        self.next += 1
+        self.cols.append(col)
+        for k in range(1, self.max_span + 1):
+            tq, bq = self.top_q[k], self.bot_q[k]
+            while tq and tq[-1][1] <= top:
+                tq.pop()
+            tq.append((i, top))
+            while bq and bq[-1][1] >= bottom:
+                bq.pop()
+            bq.append((i, bottom))
+
+            start = i - k + 1
+            while tq[0][0] < start:
+                tq.popleft()
+            while bq[0][0] < start:
+                bq.popleft()
+            if start >= self.base:
+                if not self.windows[k]:
+                    self.win_start[k] = start
+                self.windows[k].append((tq[0][1], bq[0][1]))
+
+    def popleft(self):
+        self.cols.popleft()
+        self.base += 1
+        for k in range(1, self.max_span + 1):
+            if self.windows[k] and self.win_start[k] < self.base:
+                self.windows[k].popleft()
+                self.win_start[k] += 1
+
+    def __len__(self):
+        return len(self.cols)
+
+    def __iter__(self):
+        return iter(self.cols)
+
+    def __getitem__(self, i):
+        return self.cols[i]
+
+    def bounds(self, i0: int, i1: int):
+        """(max top, min bottom) in blocks over columns i0..i1 (inclusive, column indices)."""
+        n = len(self.cols)
+        i0 = clamp(i0, 0, n - 1)
+        i1 = clamp(i1, i0, n - 1)
+        k = i1 - i0 + 1
+        if k <= self.max_span:
+            return self.windows[k][self.base + i0 - self.win_start[k]]
+        # wider than anything we track (not expected for game entities)
+        span = [self.cols[i] for i in range(i0, i1 + 1)]
+        return max(t for t, _ in span), min(b for _, b in span)
+
+
+def corridor_bounds_px_for_span(spans: CorridorSpans, tunnel_scroll_x, x0: float, x1: float):
+    # every column touched by screen x in [x0, x1)
+    i0 = int((x0 + tunnel_scroll_x) // BLOCK)
+    i1 = int((max(x0, x1 - 1) + tunnel_scroll_x) // BLOCK)
+    top, bottom = spans.bounds(i0, i1)
     return top * BLOCK, bottom * BLOCK
 
 
@@ -218,6 +759,58 @@ def draw_tunnel_blocks(screen, tunnel_cols, tunnel_scroll_x, rows_in_blocks, wal
             screen.blit(wall_tile, (x, rr * BLOCK))
 
 
+def tunnel_block_blits(tunnel_cols, tunnel_scroll_x, rows_in_blocks, wall_tile: pygame.Surface):
+    # same tiles as draw_tunnel_blocks, as (surface, pos) pairs for Surface.blits
+    out = []
+    for i, (top, bottom) in enumerate(tunnel_cols):
+        x = i * BLOCK - tunnel_scroll_x
+
+        start_top = max(0, top - WALL_BAND_THICKNESS)
+        for rr in range(start_top, top):
+            out.append((wall_tile, (x, rr * BLOCK)))
+
+        end_bot = min(rows_in_blocks, bottom + WALL_BAND_THICKNESS)
+        for rr in range(bottom, end_bot):
+            out.append((wall_tile, (x, rr * BLOCK)))
+    return out
+
+
+# =============================
+# STRESS MODE
+# =============================
+class StressTuning:
+    """Spawn / fire settings for one session; StressTuning() is the normal game.
+
+    mult scales the spawn chances up and the spawn gaps down, and from mult > 1
+    on asteroids and UFOs show up from level 1. fire scales each UFO's fire
+    rate on top of that, which is what pushes the projectile count into the
+    thousands.
+    """
+
+    def __init__(self, mult: int = 1, fire: float = 1.0):
+        self.mult = max(1, mult)
+        self.fire = fire
+        rate = self.mult * fire
+        self.ufo_fire_per_sec = UFO_FIRE_CHANCE_PER_SEC * rate
+        self.planet_chance = min(1.0, PLANET_SPAWN_CHANCE_PER_COLUMN * self.mult)
+        self.asteroid_chance = min(1.0, ASTEROID_SPAWN_CHANCE_PER_COLUMN * self.mult)
+        self.ufo_chance = min(1.0, UFO_SPAWN_CHANCE_PER_COLUMN * self.mult)
+        self.planet_gap = max(1, PLANET_MIN_GAP_COLS // self.mult)
+        self.asteroid_gap = max(1, ASTEROID_MIN_GAP_COLS // self.mult)
+        self.ufo_gap = max(1, UFO_MIN_GAP_COLS // self.mult)
+        self.asteroid_level = 2 if self.mult == 1 else 1
+        self.ufo_level = 3 if self.mult == 1 else 1
+
+    @property
+    def active(self) -> bool:
+        return self.mult > 1 or self.fire != 1.0
+
+    @classmethod
+    def from_replay(cls, replay: dict) -> "StressTuning":
+        # a replay is only valid under the stress settings it was recorded with
+        return cls(replay.get("stress", 1), replay.get("stress_fire", 1.0))
+
+
 # =============================
 # UI: HEARTS + PICKUP
 # =============================
@@ -244,9 +837,16 @@ def draw_heart_pickup(screen, rect: pygame.Rect):
     pygame.draw.rect(screen, (255, 210, 220), rect, 2, border_radius=4)
 
 
-def draw_center_banner(screen: pygame.Surface, big_font, font, title: str, line1: str, line2: str):
+def make_banner_overlay() -> pygame.Surface:
     overlay = pygame.Surface((SCREEN_W, SCREEN_H), pygame.SRCALPHA)
     overlay.fill((0, 0, 0, 165))
+    return overlay
+
+
+def draw_center_banner(screen: pygame.Surface, big_font, font, title: str, line1: str, line2: str, overlay=None):
+    # pass a prebuilt overlay to avoid allocating a full-screen surface every frame
+    if overlay is None:
+        overlay = make_banner_overlay()
     screen.blit(overlay, (0, 0))
 
     t = big_font.render(title, True, (240, 240, 240))
@@ -261,12 +861,48 @@ def draw_center_banner(screen: pygame.Surface, big_font, font, title: str, line1
 # =============================
 # MAIN
 # =============================
-def main():
+def run_game(seed=None, replay=None, record_path=None, realtime=True, frame_sink=None, renderer="batched",
+             render=True, deadline=None, start_snapshot=None, seek=0, stress=None, immortal=False):
+    """Play (or replay) one session; returns the final score / level / win state.
+
+    With a replay, per-frame dt and inputs come from the replay instead of the
+    clock and keyboard; realtime=False drops clock.tick throttling and
+    render=False skips drawing entirely. frame_sink.submit(screen) gets every
+    drawn frame. Past deadline (time.monotonic()) a TimeoutError is raised.
+    start_snapshot (bytes from a snapshot) starts from a saved state instead of
+    a fresh game; the first seek frames are simulated without drawing or
+    throttling. stress (StressTuning) defaults to the replay's own settings, or
+    the normal game. immortal=True never lets hp drop below half a heart (test
+    harnesses use it to get through every level).
+    """
     pygame.init()
     screen = pygame.display.set_mode((SCREEN_W, SCREEN_H))
     pygame.display.set_caption("Tunnel Shooter (Levels + Transitions)")
     clock = pygame.time.Clock()
 
+    if replay is not None:
+        seed = replay["seed"]
+    elif seed is None:
+        seed = random.randrange(2 ** 32)
+    random.seed(seed)
+    if replay is not None and start_snapshot is None:
+        start_snapshot = replay_start_snapshot(replay)
+    if stress is None:
+        stress = StressTuning.from_replay(replay) if replay is not None else StressTuning()
+    recording = new_replay(seed, start_snapshot, stress) if record_path is not None else None
+    replay_i = 0
+    # a replay is simulated with the frame clamp of the fps cap it was recorded under
+    dt_max = max_frame_dt(replay.get("fps", FPS) if replay is not None else FPS)
+    frame_count = 0
+    draw_seconds = 0.0
+
+    # cosmetic only (own RNG, not in snapshots), so runs that never draw skip them entirely
+    particles = ParticleSystem(PARTICLE_CAPACITY, seed) if np is not None and render else None
+
+    def emit_particles(kind: str, x: float, y: float, n: int, direction=None, spread=math.pi):
+        if particles is not None:
+            particles.emit(kind, x, y, n, direction, spread)
+
     font = pygame.font.SysFont("Arial", 20)
     big_font = pygame.font.SysFont("Arial", 54, bold=True)
 
@@ -276,9 +912,8 @@ def main():
     bg_tiles = [bg1, bg2]
     TILE_W, TILE_H = bg1.get_size()
 
-    # wall tile
-    wall_raw = load_img(ASSETS_WALL, alpha=True)
-    wall_tile = pygame.transform.smoothscale(wall_raw, (BLOCK, BLOCK))
+    # wall tile (the full-size original isn't kept)
+    wall_tile = pygame.transform.smoothscale(load_img(ASSETS_WALL, alpha=True), (BLOCK, BLOCK))
 
     # ship
     ship = load_img(ASSETS_SHIP, alpha=True)
@@ -295,17 +930,47 @@ def main():
         img = scale_to_height(img, PLANET_SCALE_H)
         planet_imgs.append(img)
 
-    # asteroid frames (raw)
+    # asteroid frames (raw) + scaled frames per target height (reused across spawns / restores)
     asteroid_raw_frames = [load_img(p, alpha=True) for p in ASTEROID_FRAMES]
+    asteroid_frame_cache = SurfaceCache(MEM_BUDGET_ASTEROID_FRAMES)
+
+    def asteroid_frames_for(target_h: int):
+        return asteroid_frame_cache.get(target_h, lambda: [scale_to_height(fr, target_h) for fr in asteroid_raw_frames])
 
     # ufo png
     ufo_img = load_img(ASSETS_UFO, alpha=True)
     ufo_img = scale_to_height(ufo_img, UFO_SCALE_H)
 
+    # pre-rendered sprites so the batched renderer only ever blits
+    ufo_bullet_img = pygame.Surface((UFO_BULLET_RADIUS * 2, UFO_BULLET_RADIUS * 2), pygame.SRCALPHA)
+    pygame.draw.circle(ufo_bullet_img, UFO_BULLET_COLOR, (UFO_BULLET_RADIUS, UFO_BULLET_RADIUS), UFO_BULLET_RADIUS)
+    heart_img = pygame.Surface(HEART_PICKUP_SIZE, pygame.SRCALPHA)
+    draw_heart_pickup(heart_img, heart_img.get_rect())
+    corridor_fill_cache = SurfaceCache()  # corridor height in blocks -> navy strip (a handful of heights)
+
+    def make_corridor_fill(h_blocks: int):
+        strip = pygame.Surface((BLOCK, h_blocks * BLOCK))
+        strip.fill(TUNNEL_INSIDE_COLOR)
+        return strip
+
+    def corridor_fill_for(h_blocks: int):
+        return corridor_fill_cache.get(h_blocks, lambda: make_corridor_fill(h_blocks))
+
+    # UI text + banner overlay; only fixed strings go through the cache, the score / stress lines
+    # change several times a second and are rendered directly
+    text_cache = SurfaceCache(MEM_BUDGET_TEXT)
+
+    def render_text(fnt, text: str, color):
+        return text_cache.get((id(fnt), text, color), lambda: fnt.render(text, True, color))
+
+    banner_overlay = make_banner_overlay()
+    show_memory = False
+
     # background grid (random once, no flicker)
     bg_cols = SCREEN_W // TILE_W + 3
     bg_rows = SCREEN_H // TILE_H + 3
-    bg_grid = [[random.choice(bg_tiles) for _ in range(bg_cols)] for _ in range(bg_rows)]
+    bg_grid_idx = [[random.randrange(len(bg_tiles)) for _ in range(bg_cols)] for _ in range(bg_rows)]
+    bg_grid = [[bg_tiles[i] for i in row] for row in bg_grid_idx]
     bg_scroll_x = 0.0
 
     # tunnel
@@ -315,7 +980,14 @@ def main():
 
     center_row = rows_in_blocks // 2
     corridor_h = (MIN_CORRIDOR_H + MAX_CORRIDOR_H) // 2
-    tunnel_cols = []
+
+    # span queries cover the widest entity (asteroids at max scale, ship, ufo) plus a partial column on each side
+    widest_px = max(
+        ship.get_width(),
+        ufo_img.get_width(),
+        max(int(fr.get_width() * ASTEROID_SCALE_H_MAX / fr.get_height()) for fr in asteroid_raw_frames),
+    )
+    tunnel_cols = CorridorSpans(widest_px // BLOCK + 2)
 
     def rebuild_tunnel(level_now: int):
         nonlocal center_row, corridor_h, tunnel_cols
@@ -330,8 +1002,8 @@ def main():
     # entities
     ship_y = SCREEN_H // 2
     bullets = []        # {"x","y","rect"}
-    planets = []        # {"x","y","img","rect"}
-    asteroids = []      # {"x","y","vx","vy","frames","frame_i","frame_t","exploding","rect"}
+    planets = []        # {"x","y","img","img_i","rect"}
+    asteroids = []      # {"x","y","vx","vy","h","frames","frame_i","frame_t","exploding","rect"}
     ufos = []           # {"x","y","vx","vy","img","rect"}
     ufo_bullets = []    # {"x","y","vx","vy"}
     heart_pickups = []  # {"x","y","rect"}
@@ -347,6 +1019,7 @@ def main():
 
     alive_time = 0.0
     shoot_cd = 0.0
+    tick = 0  # gameplay ticks (paused frames don't count)
 
     hp = MAX_HP_UNITS
     invuln = 0.0
@@ -360,7 +1033,7 @@ def main():
         nonlocal hp, invuln
         if invuln > 0.0:
             return
-        hp = max(0, hp - amount_units)
+        hp = max(1 if immortal else 0, hp - amount_units)
         invuln = INVULN_TIME
 
     def heal_one_heart():
@@ -371,7 +1044,7 @@ def main():
         nonlocal ship_y, bg_scroll_x, tunnel_scroll_x
         nonlocal bullets, planets, asteroids, ufos, ufo_bullets, heart_pickups
         nonlocal cols_since_last_planet, cols_since_last_asteroid, cols_since_last_ufo, cols_since_last_heart
-        nonlocal score, game_over, game_won, alive_time, shoot_cd, hp, invuln
+        nonlocal score, game_over, game_won, alive_time, shoot_cd, tick, hp, invuln
         nonlocal current_level, transition_timer, in_transition
 
         ship_y = SCREEN_H // 2
@@ -395,6 +1068,7 @@ def main():
         game_won = False
         alive_time = 0.0
         shoot_cd = 0.0
+        tick = 0
 
         hp = MAX_HP_UNITS
         invuln = 0.0
@@ -404,23 +1078,221 @@ def main():
         in_transition = True
 
         rebuild_tunnel(current_level)
+        clear_rewind()
+        if particles is not None:
+            particles.clear()
+
+    def snapshot() -> bytes:
+        # Surfaces are stored as indices / sizes and re-resolved on restore
+        return encode_snapshot({
+            "rng": rng_state_to_json(random.getstate()),
+            "tick": tick,
+            "ship_y": ship_y,
+            "bg_scroll_x": bg_scroll_x,
+            "bg_grid": bg_grid_idx,
+            "tunnel_scroll_x": tunnel_scroll_x,
+            "center_row": center_row,
+            "corridor_h": corridor_h,
+            "tunnel_cols": list(tunnel_cols),
+            "bullets": [[b["x"], b["y"], list(b["rect"])] for b in bullets],
+            "planets": [[pl["x"], pl["y"], pl["img_i"], list(pl["rect"])] for pl in planets],
+            "asteroids": [
+                [a["x"], a["y"], a["vx"], a["vy"], a["h"], a["frame_i"], a["frame_t"], a["exploding"], list(a["rect"])]
+                for a in asteroids
+            ],
+            "ufos": [[u["x"], u["y"], u["vx"], u["vy"], list(u["rect"])] for u in ufos],
+            "ufo_bullets": [[ub["x"], ub["y"], ub["vx"], ub["vy"]] for ub in ufo_bullets],
+            "heart_pickups": [[h["x"], h["y"], list(h["rect"])] for h in heart_pickups],
+            "cols_since_last": [cols_since_last_planet, cols_since_last_asteroid, cols_since_last_ufo, cols_since_last_heart],
+            "score": score,
+            "game_over": game_over,
+            "game_won": game_won,
+            "alive_time": alive_time,
+            "shoot_cd": shoot_cd,
+            "hp": hp,
+            "invuln": invuln,
+            "current_level": current_level,
+            "transition_timer": transition_timer,
+            "in_transition": in_transition,
+        })
+
+    def restore(blob: bytes):
+        nonlocal ship_y, bg_scroll_x, tunnel_scroll_x, center_row, corridor_h
+        nonlocal cols_since_last_planet, cols_since_last_asteroid, cols_since_last_ufo, cols_since_last_heart
+        nonlocal score, game_over, game_won, alive_time, shoot_cd, tick, hp, invuln
+        nonlocal current_level, transition_timer, in_transition
+
+        st = decode_snapshot(blob)
+        random.setstate(rng_state_from_json(st["rng"]))
+        tick = st["tick"]
+        ship_y = st["ship_y"]
+
+        bg_scroll_x = st["bg_scroll_x"]
+        bg_grid_idx[:] = st["bg_grid"]
+        bg_grid[:] = [[bg_tiles[i] for i in row] for row in bg_grid_idx]
+
+        tunnel_scroll_x = st["tunnel_scroll_x"]
+        center_row = st["center_row"]
+        corridor_h = st["corridor_h"]
+        tunnel_cols.clear()
+        for col in st["tunnel_cols"]:
+            tunnel_cols.append(tuple(col))
+
+        bullets[:] = [{"x": x, "y": y, "rect": pygame.Rect(r)} for x, y, r in st["bullets"]]
+        planets[:] = [
+            {"x": x, "y": y, "img": planet_imgs[i], "img_i": i, "rect": pygame.Rect(r)}
+            for x, y, i, r in st["planets"]
+        ]
+        asteroids[:] = [
+            {
+                "x": x, "y": y,
+                "vx": vx, "vy": vy,
+                "h": h,
+                "frames": asteroid_frames_for(h),
+                "frame_i": fi,
+                "frame_t": ft,
+                "exploding": exploding,
+                "rect": pygame.Rect(r),
+            }
+            for x, y, vx, vy, h, fi, ft, exploding, r in st["asteroids"]
+        ]
+        ufos[:] = [
+            {"x": x, "y": y, "vx": vx, "vy": vy, "img": ufo_img, "rect": pygame.Rect(r)}
+            for x, y, vx, vy, r in st["ufos"]
+        ]
+        ufo_bullets[:] = [{"x": x, "y": y, "vx": vx, "vy": vy} for x, y, vx, vy in st["ufo_bullets"]]
+        heart_pickups[:] = [{"x": x, "y": y, "rect": pygame.Rect(r)} for x, y, r in st["heart_pickups"]]
+
+        cols_since_last_planet, cols_since_last_asteroid, cols_since_last_ufo, cols_since_last_heart = st["cols_since_last"]
+
+        score = st["score"]
+        game_over = st["game_over"]
+        game_won = st["game_won"]
+        alive_time = st["alive_time"]
+        shoot_cd = st["shoot_cd"]
+        hp = st["hp"]
+        invuln = st["invuln"]
+
+        current_level = st["current_level"]
+        transition_timer = st["transition_timer"]
+        in_transition = st["in_transition"]
+
+        # particles are cosmetic and not part of snapshots
+        if particles is not None:
+            particles.clear()
+
+    # ring buffer of recent snapshots, capped by count and by MEM_BUDGET_REWIND bytes
+    rewind_buffer = deque()
+    rewind_bytes = 0
+
+    def push_snapshot(blob: bytes):
+        nonlocal rewind_bytes
+        rewind_buffer.append(blob)
+        rewind_bytes += len(blob)
+        while len(rewind_buffer) > 1 and (len(rewind_buffer) > REWIND_BUFFER_SIZE or rewind_bytes > MEM_BUDGET_REWIND):
+            rewind_bytes -= len(rewind_buffer.popleft())
+
+    def pop_snapshot() -> bytes:
+        nonlocal rewind_bytes
+        blob = rewind_buffer.pop()
+        rewind_bytes -= len(blob)
+        return blob
+
+    def clear_rewind():
+        nonlocal rewind_bytes
+        rewind_buffer.clear()
+        rewind_bytes = 0
+
+    # static assets, measured once
+    asset_bytes = {
+        "background tiles": surface_bytes(bg_tiles),
+        "wall tile": surface_bytes(wall_tile),
+        "ship": surface_bytes(ship),
+        "bullet": surface_bytes(bullet_img),
+        "planets": surface_bytes(planet_imgs),
+        "asteroid frames (raw)": surface_bytes(asteroid_raw_frames),
+        "ufo": surface_bytes(ufo_img),
+        "sprites (ufo bullet, heart)": surface_bytes([ufo_bullet_img, heart_img]),
+        "banner overlay": surface_bytes(banner_overlay),
+    }
+
+    def memory_report() -> dict:
+        """Bytes held right now: {"assets" | "caches" | "pools": {name: {"bytes", "budget"?, "evictions"?}}}."""
+        pools = {
+            "bullets": entity_pool_bytes(bullets),
+            "planets": entity_pool_bytes(planets),
+            "asteroids": entity_pool_bytes(asteroids),
+            "ufos": entity_pool_bytes(ufos),
+            "ufo bullets": entity_pool_bytes(ufo_bullets),
+            "heart pickups": entity_pool_bytes(heart_pickups),
+            "tunnel": entity_pool_bytes(tunnel_cols.cols),
+        }
+        if particles is not None:
+            pools["particles"] = particles.nbytes
+        return {
+            "assets": {name: {"bytes": b} for name, b in asset_bytes.items()},
+            "caches": {
+                "asteroid frames": {"bytes": asteroid_frame_cache.nbytes, "budget": MEM_BUDGET_ASTEROID_FRAMES,
+                                    "evictions": asteroid_frame_cache.evictions},
+                "text": {"bytes": text_cache.nbytes, "budget": MEM_BUDGET_TEXT, "evictions": text_cache.evictions},
+                "corridor fill": {"bytes": corridor_fill_cache.nbytes},
+                "rewind snapshots": {"bytes": rewind_bytes, "budget": MEM_BUDGET_REWIND},
+            },
+            "pools": {name: {"bytes": b} for name, b in pools.items()},
+        }
 
     rebuild_tunnel(current_level)
+    if start_snapshot is not None:
+        restore(start_snapshot)
 
     running = True
     while running:
-        dt = clock.tick(FPS) / 1000.0
-
+        if deadline is not None and time.monotonic() > deadline:
+            raise TimeoutError(f"Replay not finished after {frame_count} frames")
+
+        if replay is not None:
+            if replay_i >= len(replay["frames"]):
+                break
+            dt, bits = replay["frames"][replay_i]
+            dt = min(dt, dt_max)
+            replay_i += 1
+            if realtime and replay_i > seek:
+                clock.tick(FPS)
+        else:
+            dt = min(clock.tick(FPS) / 1000.0, dt_max)
+
+        restart_pressed = False
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
             if event.type == pygame.KEYDOWN and event.key == pygame.K_r:
-                restart()
-
-        keys = pygame.key.get_pressed()
+                restart_pressed = True
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F5:
+                save_snapshot(QUICKSAVE_PATH, snapshot())
+            # quick-load isn't part of the input stream, so it's off while recording / replaying
+            if (event.type == pygame.KEYDOWN and event.key == pygame.K_F9 and QUICKSAVE_PATH.exists()
+                    and replay is None and recording is None):
+                restore(load_snapshot(QUICKSAVE_PATH))
+                clear_rewind()
+            if event.type == pygame.KEYDOWN and event.key == MEM_OVERLAY_KEY:
+                show_memory = not show_memory
+
+        if replay is None:
+            bits = keys_to_input_bits(pygame.key.get_pressed(), restart_pressed)
+        if recording is not None:
+            recording["frames"].append([dt, bits])
+        frame_count += 1
+
+        if bits & INPUT_RESTART:
+            restart()
+
+        # REWIND: step back one snapshot per frame while held
+        rewinding = bool(bits & INPUT_REWIND) and len(rewind_buffer) > 0
+        if rewinding:
+            restore(pop_snapshot())
 
         # WIN check
-        if not game_won and score >= WIN_SCORE:
+        if not rewinding and not game_won and score >= WIN_SCORE:
             game_won = True
             in_transition = False
 
@@ -431,21 +1303,23 @@ def main():
         scroll_speed_now = SCROLL_SPEED_PX_PER_SEC * scroll_mul
 
         # Level transition trigger
-        if (not game_over) and (not game_won) and (level != current_level):
+        if (not rewinding) and (not game_over) and (not game_won) and (level != current_level):
             current_level = level
             transition_timer = LEVEL_BANNER_TIME
             in_transition = True
 
         # UPDATE (pause gameplay during transition or end states)
-        if not game_over and not game_won and not in_transition:
+        if not rewinding and not game_over and not game_won and not in_transition:
+            tick += 1
             alive_time += dt
             shoot_cd = max(0.0, shoot_cd - dt)
             invuln = max(0.0, invuln - dt)
+            ship_y_prev = ship_y
 
             # ship move
-            if keys[pygame.K_UP]:
+            if bits & INPUT_UP:
                 ship_y -= ship_speed_now * dt
-            if keys[pygame.K_DOWN]:
+            if bits & INPUT_DOWN:
                 ship_y += ship_speed_now * dt
 
             ship_rect = ship.get_rect(center=(SHIP_X, ship_y))
@@ -453,7 +1327,7 @@ def main():
             ship_rect = ship.get_rect(center=(SHIP_X, ship_y))
 
             # shoot
-            if keys[pygame.K_SPACE] and shoot_cd <= 0.0:
+            if bits & INPUT_SHOOT and shoot_cd <= 0.0:
                 shoot_cd = BULLET_COOLDOWN
                 bx = ship_rect.right + 6
                 by = ship_rect.centery - bullet_img.get_height() // 2
@@ -467,6 +1341,10 @@ def main():
             bg_scroll_x = (bg_scroll_x + scroll_speed_now * dt * 0.35) % TILE_W
             tunnel_scroll_x += scroll_speed_now * dt
 
+            # particles drift with the tunnel
+            if particles is not None:
+                particles.update(dt, scroll_speed_now * dt)
+
             # move ship bullets right
             for b in bullets:
                 b["x"] += BULLET_SPEED_PX_PER_SEC * dt
@@ -485,14 +1363,14 @@ def main():
                 h["rect"].topleft = (int(h["x"]), int(h["y"]))
             heart_pickups[:] = [h for h in heart_pickups if h["x"] + h["rect"].width > -120]
 
-            # move asteroids (level 2+)
-            if level >= 2:
+            # move asteroids (level 2+, any level under stress)
+            if level >= stress.asteroid_level:
                 for a in asteroids:
                     if not a["exploding"]:
                         a["x"] -= (scroll_speed_now + a["vx"]) * dt
                         a["y"] += a["vy"] * dt
 
-                        top_px, bot_px = corridor_bounds_px_for_x(tunnel_cols, tunnel_scroll_x, a["x"] + a["rect"].width * 0.5)
+                        top_px, bot_px = corridor_bounds_px_for_span(tunnel_cols, tunnel_scroll_x, a["x"], a["x"] + a["rect"].width)
                         y_min = top_px + ASTEROID_SAFE_MARGIN_PX
                         y_max = bot_px - a["rect"].height - ASTEROID_SAFE_MARGIN_PX
                         if y_max > y_min:
@@ -521,12 +1399,12 @@ def main():
                 asteroids.clear()
 
             # move UFOs + shoot (level 3+)
-            if level >= 3:
+            if level >= stress.ufo_level:
                 for u in ufos:
                     u["x"] -= (scroll_speed_now + u["vx"]) * dt
                     u["y"] += u["vy"] * dt
 
-                    top_px, bot_px = corridor_bounds_px_for_x(tunnel_cols, tunnel_scroll_x, u["x"] + u["rect"].width * 0.5)
+                    top_px, bot_px = corridor_bounds_px_for_span(tunnel_cols, tunnel_scroll_x, u["x"], u["x"] + u["rect"].width)
                     y_min = top_px + 8
                     y_max = bot_px - u["rect"].height - 8
                     if y_max > y_min:
@@ -539,8 +1417,11 @@ def main():
 
                     u["rect"].topleft = (int(u["x"]), int(u["y"]))
 
-                    if random.random() < UFO_FIRE_CHANCE_PER_SEC * dt:
-                        bx = u["rect"].left - 2
+                    # whole shots this frame + a chance at one more (stress rates can exceed one per frame)
+                    fire = stress.ufo_fire_per_sec * dt
+                    shots = int(fire) + (random.random() < fire - int(fire))
+                    for k in range(shots):
+                        bx = u["rect"].left - 2 - k * UFO_BULLET_SPEED * dt / shots
                         by = u["rect"].centery
                         ufo_bullets.append({"x": float(bx), "y": float(by), "vx": -UFO_BULLET_SPEED, "vy": 0.0})
 
@@ -560,7 +1441,7 @@ def main():
                 tunnel_scroll_x -= BLOCK
                 score += 1
 
-                tunnel_cols.pop(0)
+                tunnel_cols.popleft()
                 center_row, corridor_h = next_tunnel_params(center_row, corridor_h, rows_in_blocks, drift_c, drift_w)
                 tunnel_cols.append(make_tunnel_column(center_row, corridor_h, rows_in_blocks))
 
@@ -570,12 +1451,13 @@ def main():
                 cols_since_last_heart += 1
 
                 # planets spawn (all levels)
-                if cols_since_last_planet >= PLANET_MIN_GAP_COLS and random.random() < PLANET_SPAWN_CHANCE_PER_COLUMN:
+                if cols_since_last_planet >= stress.planet_gap and random.random() < stress.planet_chance:
                     spawn_top, spawn_bottom = tunnel_cols[-1]
                     corridor_top_px = spawn_top * BLOCK
                     corridor_bot_px = spawn_bottom * BLOCK
 
-                    img = random.choice(planet_imgs)
+                    img_i = random.randrange(len(planet_imgs))
+                    img = planet_imgs[img_i]
                     w, h = img.get_size()
 
                     y_min = corridor_top_px + PLANET_SAFE_MARGIN_PX
@@ -584,18 +1466,18 @@ def main():
                         y = random.randint(int(y_min), int(y_max))
                         x = SCREEN_W + 30
                         rect = img.get_rect(topleft=(x, y))
-                        planets.append({"x": float(x), "y": float(y), "img": img, "rect": rect})
+                        planets.append({"x": float(x), "y": float(y), "img": img, "img_i": img_i, "rect": rect})
                         cols_since_last_planet = 0
 
                 # asteroids spawn (level 2+)
-                if level >= 2:
-                    if cols_since_last_asteroid >= ASTEROID_MIN_GAP_COLS and random.random() < ASTEROID_SPAWN_CHANCE_PER_COLUMN:
+                if level >= stress.asteroid_level:
+                    if cols_since_last_asteroid >= stress.asteroid_gap and random.random() < stress.asteroid_chance:
                         spawn_top, spawn_bottom = tunnel_cols[-1]
                         corridor_top_px = spawn_top * BLOCK
                         corridor_bot_px = spawn_bottom * BLOCK
 
                         target_h = random.randint(ASTEROID_SCALE_H_MIN, ASTEROID_SCALE_H_MAX)
-                        frames = [scale_to_height(fr, target_h) for fr in asteroid_raw_frames]
+                        frames = asteroid_frames_for(target_h)
                         w, h = frames[0].get_size()
 
                         y_min = corridor_top_px + ASTEROID_SAFE_MARGIN_PX
@@ -609,6 +1491,7 @@ def main():
                             asteroids.append({
                                 "x": float(x), "y": float(y),
                                 "vx": vx, "vy": vy,
+                                "h": target_h,
                                 "frames": frames,
                                 "frame_i": 0,
                                 "frame_t": 0.0,
@@ -618,8 +1501,8 @@ def main():
                             cols_since_last_asteroid = 0
 
                 # UFO spawn (level 3+)
-                if level >= 3:
-                    if cols_since_last_ufo >= UFO_MIN_GAP_COLS and random.random() < UFO_SPAWN_CHANCE_PER_COLUMN:
+                if level >= stress.ufo_level:
+                    if cols_since_last_ufo >= stress.ufo_gap and random.random() < stress.ufo_chance:
                         spawn_top, spawn_bottom = tunnel_cols[-1]
                         corridor_top_px = spawn_top * BLOCK
                         corridor_bot_px = spawn_bottom * BLOCK
@@ -654,57 +1537,78 @@ def main():
                             cols_since_last_heart = 0
 
             # BULLETS HIT (destroy / explode)
+            # swept over this frame's motion, so the earliest target along the path wins
             for b in bullets[:]:
-                hit = False
+                bullet_dx = BULLET_SPEED_PX_PER_SEC * dt
+                hit_t, hit_kind, hit_obj = None, None, None
 
-                # planets: instantly removed
-                for pl in planets[:]:
-                    if b["rect"].colliderect(pl["rect"]):
-                        planets.remove(pl)
-                        score += 10
-                        hit = True
-                        break
-                if hit:
-                    bullets.remove(b)
-                    continue
+                for pl in planets:
+                    t = swept_hit(b["rect"], bullet_dx + scroll_speed_now * dt, 0.0, pl["rect"])
+                    if t is not None and (hit_t is None or t < hit_t):
+                        hit_t, hit_kind, hit_obj = t, "planet", pl
 
-                # asteroids: start crash animation (don’t delete instantly)
                 for a in asteroids:
-                    if (not a["exploding"]) and b["rect"].colliderect(a["rect"]):
-                        a["exploding"] = True
-                        a["vx"] = 0.0
-                        a["vy"] = 0.0
-                        a["frame_i"] = 0
-                        a["frame_t"] = 0.0
-                        score += 15
-                        hit = True
-                        break
-                if hit:
-                    bullets.remove(b)
+                    if not a["exploding"]:
+                        t = swept_hit(b["rect"], bullet_dx + (scroll_speed_now + a["vx"]) * dt, -a["vy"] * dt, a["rect"])
+                        if t is not None and (hit_t is None or t < hit_t):
+                            hit_t, hit_kind, hit_obj = t, "asteroid", a
+
+                for u in ufos:
+                    t = swept_hit(b["rect"], bullet_dx + (scroll_speed_now + u["vx"]) * dt, -u["vy"] * dt, u["rect"])
+                    if t is not None and (hit_t is None or t < hit_t):
+                        hit_t, hit_kind, hit_obj = t, "ufo", u
+
+                if hit_kind is None:
                     continue
+                bullets.remove(b)
+                # impact where the bullet actually met the target, not where it ended the frame
+                impact_x = b["rect"].right - bullet_dx * (1.0 - hit_t)
+                emit_particles("impact", impact_x, b["rect"].centery, PARTICLES_IMPACT, math.pi, 1.2)
+
+                # planets: instantly removed
+                if hit_kind == "planet":
+                    planets.remove(hit_obj)
+                    cx, cy = hit_obj["rect"].center
+                    emit_particles("debris", cx, cy, PARTICLES_PLANET_DEBRIS)
+                    emit_particles("spark", cx, cy, PARTICLES_PLANET_SPARKS)
+                    score += 10
+
+                # asteroids: start crash animation (don’t delete instantly)
+                elif hit_kind == "asteroid":
+                    a = hit_obj
+                    a["exploding"] = True
+                    a["vx"] = 0.0
+                    a["vy"] = 0.0
+                    a["frame_i"] = 0
+                    a["frame_t"] = 0.0
+                    emit_particles("spark", *a["rect"].center, PARTICLES_ASTEROID_SPARKS)
+                    score += 15
 
                 # ufos: removed
-                for u in ufos[:]:
-                    if b["rect"].colliderect(u["rect"]):
-                        ufos.remove(u)
-                        score += 25
-                        hit = True
-                        break
-                if hit:
-                    bullets.remove(b)
+                else:
+                    ufos.remove(hit_obj)
+                    cx, cy = hit_obj["rect"].center
+                    emit_particles("debris", cx, cy, PARTICLES_UFO_DEBRIS)
+                    emit_particles("spark", cx, cy, PARTICLES_UFO_SPARKS)
+                    score += 25
 
             # DAMAGE / COLLISIONS
             if alive_time > SPAWN_GRACE:
                 ship_rect = ship.get_rect(center=(SHIP_X, ship_y))
 
-                # wall (-0.5) + push back inside
-                corridor_top_px, corridor_bot_px = corridor_bounds_px_for_x(tunnel_cols, tunnel_scroll_x, SHIP_X)
+                # wall (-0.5) + push back inside, over every column the ship covers (nose included)
+                corridor_top_px, corridor_bot_px = corridor_bounds_px_for_span(
+                    tunnel_cols, tunnel_scroll_x, ship_rect.left, ship_rect.right
+                )
                 if ship_rect.top < corridor_top_px:
                     damage(DMG_HALF)
                     ship_y = corridor_top_px + ship_rect.height // 2 + 1
+                    # scrape sparks fly down/back, away from the ceiling
+                    emit_particles("wall_spark", SHIP_X, corridor_top_px, PARTICLES_WALL_SCRAPE, math.pi * 0.75, 0.6)
                 elif ship_rect.bottom > corridor_bot_px:
                     damage(DMG_HALF)
                     ship_y = corridor_bot_px - ship_rect.height // 2 - 1
+                    emit_particles("wall_spark", SHIP_X, corridor_bot_px, PARTICLES_WALL_SCRAPE, -math.pi * 0.75, 0.6)
 
                 ship_rect = ship.get_rect(center=(SHIP_X, ship_y))
 
@@ -722,11 +1626,14 @@ def main():
                             damage(DMG_HALF)
                             break
 
-                # ufo bullet (-0.5)
+                # ufo bullet (-0.5), swept relative to the ship's own vertical motion
                 if invuln <= 0.0:
+                    ship_dy = ship_y - ship_y_prev
                     for ub in ufo_bullets:
-                        if ship_rect.collidepoint(int(ub["x"]), int(ub["y"])):
+                        ub_rect = pygame.Rect(int(ub["x"]), int(ub["y"]), 1, 1)
+                        if swept_hit(ub_rect, ub["vx"] * dt, ub["vy"] * dt - ship_dy, ship_rect) is not None:
                             damage(DMG_HALF)
+                            emit_particles("impact", ub["x"], ub["y"], PARTICLES_IMPACT, 0.0, 1.2)
                             break
 
                 # crash UFO (-1)
@@ -739,6 +1646,9 @@ def main():
                     if hit_u:
                         damage(DMG_FULL)
                         ufos.remove(hit_u)
+                        cx, cy = hit_u["rect"].center
+                        emit_particles("debris", cx, cy, PARTICLES_UFO_DEBRIS)
+                        emit_particles("spark", cx, cy, PARTICLES_UFO_SPARKS)
 
                 # heart pickup (+1 heart)
                 for h in heart_pickups[:]:
@@ -750,62 +1660,105 @@ def main():
                 if hp <= 0:
                     game_over = True
 
+            if tick % SNAPSHOT_EVERY_TICKS == 0:
+                push_snapshot(snapshot())
+
         # Transition countdown (runs even while paused)
-        if in_transition and not game_over and not game_won:
+        if not rewinding and in_transition and not game_over and not game_won:
             transition_timer -= dt
             if transition_timer <= 0.0:
                 in_transition = False
 
+        if not render or frame_count <= seek:
+            continue
+
         # DRAW
+        draw_t0 = time.perf_counter()
         screen.fill((0, 0, 0))
 
-        # background
-        for r in range(bg_rows):
-            for c in range(bg_cols):
-                x = c * TILE_W - bg_scroll_x
-                y = r * TILE_H
-                screen.blit(bg_grid[r][c], (x, y))# --- dark navy inside the tunnel (corridor fill) ---
-        for i, (top, bottom) in enumerate(tunnel_cols):
-                x = i * BLOCK - tunnel_scroll_x
-                y = top * BLOCK
-                h = (bottom - top) * BLOCK
-
-                rect = pygame.Rect(x, y, BLOCK, h)
-                pygame.draw.rect(screen, TUNNEL_INSIDE_COLOR, rect)
+        if renderer == "reference":
+            # background
+            for r in range(bg_rows):
+                for c in range(bg_cols):
+                    x = c * TILE_W - bg_scroll_x
+                    y = r * TILE_H
+                    screen.blit(bg_grid[r][c], (x, y))# --- dark navy inside the tunnel (corridor fill) ---
+            for i, (top, bottom) in enumerate(tunnel_cols):
+                    x = i * BLOCK - tunnel_scroll_x
+                    y = top * BLOCK
+                    h = (bottom - top) * BLOCK
 
+                    rect = pygame.Rect(x, y, BLOCK, h)
+                    pygame.draw.rect(screen, TUNNEL_INSIDE_COLOR, rect)
 
 
 
 
-        # tunnel walls
-        draw_tunnel_blocks(screen, tunnel_cols, tunnel_scroll_x, rows_in_blocks, wall_tile)
 
-        # planets
-        for pl in planets:
-            screen.blit(pl["img"], pl["rect"].topleft)
+            # tunnel walls
+            draw_tunnel_blocks(screen, tunnel_cols, tunnel_scroll_x, rows_in_blocks, wall_tile)
 
-        # asteroids (frame based on state)
-        for a in asteroids:
-            fi = a["frame_i"]
-            if fi < 0:
-                fi = 0
-            if fi >= len(a["frames"]):
-                fi = len(a["frames"]) - 1
-            screen.blit(a["frames"][fi], a["rect"].topleft)
-
-        # ufos + their bullets
-        for u in ufos:
-            screen.blit(u["img"], u["rect"].topleft)
-        for ub in ufo_bullets:
-            pygame.draw.circle(screen, UFO_BULLET_COLOR, (int(ub["x"]), int(ub["y"])), UFO_BULLET_RADIUS)
+            # planets
+            for pl in planets:
+                screen.blit(pl["img"], pl["rect"].topleft)
+
+            # asteroids (frame based on state)
+            for a in asteroids:
+                fi = a["frame_i"]
+                if fi < 0:
+                    fi = 0
+                if fi >= len(a["frames"]):
+                    fi = len(a["frames"]) - 1
+                screen.blit(a["frames"][fi], a["rect"].topleft)
+
+            # ufos + their bullets
+            for u in ufos:
+                screen.blit(u["img"], u["rect"].topleft)
+            for ub in ufo_bullets:
+                pygame.draw.circle(screen, UFO_BULLET_COLOR, (int(ub["x"]), int(ub["y"])), UFO_BULLET_RADIUS)
 
-        # heart pickups
-        for h in heart_pickups:
-            draw_heart_pickup(screen, h["rect"])
+            # heart pickups
+            for h in heart_pickups:
+                draw_heart_pickup(screen, h["rect"])
 
-        # ship bullets
-        for b in bullets:
-            screen.blit(bullet_img, b["rect"].topleft)
+            # ship bullets
+            for b in bullets:
+                screen.blit(bullet_img, b["rect"].topleft)
+        else:
+            # draw list in layer order, submitted with a single blits call (two while a heart is on an edge)
+            draw_list = []
+            for r in range(bg_rows):
+                for c in range(bg_cols):
+                    draw_list.append((bg_grid[r][c], (c * TILE_W - bg_scroll_x, r * TILE_H)))
+            for i, (top, bottom) in enumerate(tunnel_cols):
+                draw_list.append((corridor_fill_for(bottom - top), (i * BLOCK - tunnel_scroll_x, top * BLOCK)))
+            draw_list += tunnel_block_blits(tunnel_cols, tunnel_scroll_x, rows_in_blocks, wall_tile)
+            draw_list += [(pl["img"], pl["rect"].topleft) for pl in planets]
+            draw_list += [(a["frames"][clamp(a["frame_i"], 0, len(a["frames"]) - 1)], a["rect"].topleft) for a in asteroids]
+            draw_list += [(u["img"], u["rect"].topleft) for u in ufos]
+            draw_list += [
+                (ufo_bullet_img, (int(ub["x"]) - UFO_BULLET_RADIUS, int(ub["y"]) - UFO_BULLET_RADIUS))
+                for ub in ufo_bullets
+            ]
+            # a rounded rect cut by the left / top edge rasterizes differently from the sprite:
+            # those few hearts are drawn the reference way, in their place in the layer order
+            edge_hearts = []
+            for h in heart_pickups:
+                if h["rect"].left < 0 or h["rect"].top < 0:
+                    edge_hearts.append(h)
+                else:
+                    draw_list.append((heart_img, h["rect"].topleft))
+            if edge_hearts:
+                screen.blits(draw_list, doreturn=False)
+                draw_list = []
+                for h in edge_hearts:
+                    draw_heart_pickup(screen, h["rect"])
+            draw_list += [(bullet_img, b["rect"].topleft) for b in bullets]
+            screen.blits(draw_list, doreturn=False)
+
+        # particles (vectorized write into the frame)
+        if particles is not None:
+            particles.draw(screen)
 
         # ship (blink on invuln)
         ship_rect = ship.get_rect(center=(SHIP_X, ship_y))
@@ -815,11 +1768,16 @@ def main():
         # UI
         lvl = get_level(score)
         screen.blit(font.render(f"Score: {score}   Level: {lvl}/5", True, (230, 230, 230)), (12, 10))
-        screen.blit(font.render("UP/DOWN move | SPACE shoot | R restart", True, (200, 200, 200)), (12, 34))
+        screen.blit(render_text(font, "UP/DOWN move | SPACE shoot | R restart | BKSP rewind", (200, 200, 200)), (12, 34))
         draw_hearts(screen, hp)
 
         if alive_time < SPAWN_GRACE and not game_over and not game_won:
-            screen.blit(font.render("Grace: no collision yet", True, (180, 220, 180)), (12, 92))
+            screen.blit(render_text(font, "Grace: no collision yet", (180, 220, 180)), (12, 92))
+
+        if stress.active:
+            n_proj = len(bullets) + len(ufo_bullets)
+            stress_line = f"STRESS x{stress.mult} fire x{stress.fire:g}  FPS {clock.get_fps():.0f}  projectiles {n_proj}"
+            screen.blit(font.render(stress_line, True, (255, 200, 120)), (12, 118))
 
         # Level banner
         if in_transition and not game_over and not game_won:
@@ -828,7 +1786,8 @@ def main():
                 screen, big_font, font,
                 f"LEVEL {current_level}",
                 now,
-                nxt
+                nxt,
+                banner_overlay,
             )
 
         # Game Over
@@ -837,7 +1796,8 @@ def main():
                 screen, big_font, font,
                 "GAME OVER",
                 "Press R to restart",
-                ""
+                "",
+                banner_overlay,
             )
 
         # Win
@@ -846,11 +1806,480 @@ def main():
                 screen, big_font, font,
                 "YOU WIN!",
                 f"Final score: {score}",
-                "Press R to play again"
+                "Press R to play again",
+                banner_overlay,
             )
 
+        if show_memory:
+            draw_memory_overlay(screen, font, memory_report())
+
+        draw_seconds += time.perf_counter() - draw_t0
+
+        if frame_sink is not None:
+            frame_sink.submit(screen)
+
         pygame.display.flip()
 
+    if recording is not None:
+        save_replay(record_path, recording)
+
+    return {
+        "score": score,
+        "level": get_level(score),
+        "won": game_won,
+        "game_over": game_over,
+        "frames": frame_count,
+        "draw_seconds": draw_seconds,
+        "memory": memory_report(),
+        "snapshot": snapshot(),
+    }
+
+
+# =============================
+# PIXEL-EQUIVALENCE HARNESS (renderer paths)
+# =============================
+def scenario_frames(rng: random.Random, frames: int) -> list:
+    # seeded synthetic input: hold up / down / nothing for random stretches, mostly shooting
+    out = []
+    bits = 0
+    for i in range(frames):
+        if i % 20 == 0:
+            bits = rng.choice((0, INPUT_UP, INPUT_DOWN))
+            if rng.random() < 0.8:
+                bits |= INPUT_SHOOT
+        out.append([SCENARIO_DT, bits])
+    return out
+
+
+def make_scenario(seed: int, frames: int, stress=None, level: int = 1) -> dict:
+    """Seeded scenario; level > 1 starts it from the state the same input reaches at that level.
+
+    Scenarios are played immortal (the warm-up too), so they run through every
+    level instead of ending on the GAME OVER screen.
+    """
+    rng = random.Random(seed)
+    start = None
+    while level > 1:
+        warmup = new_replay(seed, start, stress)
+        warmup["frames"] = scenario_frames(rng, SCENARIO_WARMUP_CHUNK)
+        result = run_game(replay=warmup, realtime=False, render=False, immortal=True)
+        start = result["snapshot"]
+        if result["level"] >= level:
+            break
+    replay = new_replay(seed, start, stress)
+    replay["frames"] = scenario_frames(rng, frames)
+    replay["immortal"] = True  # read by pixel_check only; run_game never looks at it
+    return replay
+
+
+class FrameHasher:
+    """Frame sink that hashes each frame's pixels (pygame.surfarray) and can compare against a reference run."""
+
+    def __init__(self, expected=None):
+        self.hashes = []
+        self.expected = expected
+        self.first_diff = None
+        self.diff_frames = 0
+
+    def submit(self, screen: pygame.Surface):
+        # pixels2d is a (w, h) view of the row-major surface, so .T is contiguous: hashed without a copy
+        pixels = pygame.surfarray.pixels2d(screen)
+        digest = hashlib.blake2b(np.ascontiguousarray(pixels.T), digest_size=16).digest()
+        del pixels  # release the surface lock
+        i = len(self.hashes)
+        self.hashes.append(digest)
+        if self.expected is not None and (i >= len(self.expected) or self.expected[i] != digest):
+            self.diff_frames += 1
+            if self.first_diff is None:
+                self.first_diff = i
+
+
+class LastFrame:
+    """Frame sink that keeps a copy of the most recent frame."""
+
+    def __init__(self):
+        self.pixels = None
+
+    def submit(self, screen: pygame.Surface):
+        self.pixels = pygame.surfarray.array3d(screen)
+
+
+def write_pixel_diff(ref, cand, out_dir: Path, name: str):
+    out_dir.mkdir(parents=True, exist_ok=True)
+    mask = (ref != cand).any(axis=2)
+    diff = (ref // 3).astype(np.uint8)
+    diff[mask] = (255, 0, 255)
+    for suffix, arr in (("ref", ref), ("candidate", cand), ("diff", diff)):
+        pygame.image.save(pygame.surfarray.make_surface(arr), str(out_dir / f"{name}_{suffix}.png"))
+    return int(mask.sum()), int(np.abs(ref.astype(np.int16) - cand).max())
+
+
+def pixel_check(replay: dict, name: str, candidate: str = "batched", reference: str = "reference",
+                diff_dir: Path = Path("pixel_diff")) -> dict:
+    """Render one replay through both paths; report the first divergent frame (+ diff image) and the speed-up."""
+    immortal = replay.get("immortal", False)
+    start = replay_start_snapshot(replay)
+    ref_sink = FrameHasher()
+    ref_result = run_game(replay=replay, realtime=False, frame_sink=ref_sink, renderer=reference, immortal=immortal)
+    cand_sink = FrameHasher(expected=ref_sink.hashes)
+    cand_result = run_game(replay=replay, realtime=False, frame_sink=cand_sink, renderer=candidate, immortal=immortal)
+
+    report = {
+        "name": name,
+        "frames": len(ref_sink.hashes),
+        "levels": (get_level(decode_snapshot(start)["score"]) if start is not None else 1, ref_result["level"]),
+        "diff_frames": cand_sink.diff_frames,
+        "first_diff": cand_sink.first_diff,
+        "ref_draw_seconds": ref_result["draw_seconds"],
+        "cand_draw_seconds": cand_result["draw_seconds"],
+        "speedup": ref_result["draw_seconds"] / max(cand_result["draw_seconds"], 1e-9),
+    }
+    if cand_sink.first_diff is not None:
+        # replays are deterministic: re-run both paths up to the divergent frame to grab it
+        upto = dict(replay, frames=replay["frames"][:cand_sink.first_diff + 1])
+        frames = []
+        for path in (reference, candidate):
+            last = LastFrame()
+            run_game(replay=upto, realtime=False, frame_sink=last, renderer=path, immortal=immortal)
+            frames.append(last.pixels)
+        report["diff_pixels"], report["max_channel_diff"] = write_pixel_diff(
+            frames[0], frames[1], diff_dir, f"{name}_frame{cand_sink.first_diff:06d}"
+        )
+    return report
+
+
+def run_pixel_checks(replays, candidate: str, diff_dir: Path) -> bool:
+    all_same = True
+    for name, replay in replays:
+        r = pixel_check(replay, name, candidate=candidate, diff_dir=diff_dir)
+        status = "SAME" if r["first_diff"] is None else f"DIFF first at frame {r['first_diff']}"
+        print(f"{name} (level {r['levels'][0]}-{r['levels'][1]}): {status} ({r['diff_frames']}/{r['frames']} frames differ) | draw "
+              f"{r['ref_draw_seconds']:.2f}s reference vs {r['cand_draw_seconds']:.2f}s {candidate} "
+              f"= {r['speedup']:.2f}x")
+        if r["first_diff"] is not None:
+            all_same = False
+            print(f"  {r['diff_pixels']} pixels differ (max channel diff {r['max_channel_diff']}), images in {diff_dir}/")
+    return all_same
+
+
+# =============================
+# REPLAY VERIFICATION (leaderboard)
+# =============================
+def check_replay(replay: dict):
+    # cheap structural checks before spending time on simulation
+    if replay.get("version") != REPLAY_VERSION:
+        return f"unsupported replay version {replay.get('version')}"
+    if replay.get("stress", 1) != 1 or replay.get("stress_fire", 1.0) != 1:
+        return "stress-mode replays are not eligible"
+    if "start_snapshot" in replay:
+        # the starting state would be taken on trust: any score can be restored before frame 0
+        return "replays starting from a snapshot are not eligible"
+    unknown = sorted(str(k) for k in replay if k not in VERIFY_REPLAY_KEYS)
+    if unknown:
+        return f"unexpected replay keys: {', '.join(unknown)}"
+    if not isinstance(replay.get("seed"), int):
+        return "missing seed"
+    fps = replay.get("fps")
+    if not isinstance(fps, int) or fps not in VERIFY_FPS_ALLOWED:
+        # uncapped (0) or unusual caps have no trustworthy slow-motion floor
+        return f"fps cap {fps!r} is not eligible (allowed: {', '.join(map(str, VERIFY_FPS_ALLOWED))})"
+    frames = replay.get("frames")
+    if not isinstance(frames, list) or not frames:
+        return "no frames"
+    # long frames are clamped by the simulation; only frames well under the fps cap are suspicious
+    dt_min = VERIFY_DT_MIN_FRAMES / fps
+    all_bits = INPUT_UP | INPUT_DOWN | INPUT_SHOOT | INPUT_REWIND | INPUT_RESTART
+    for i, fr in enumerate(frames):
+        if not (isinstance(fr, list) and len(fr) == 2):
+            return f"frame {i}: malformed"
+        dt, bits = fr
+        if not isinstance(dt, (int, float)) or not dt_min <= dt < math.inf:
+            return f"frame {i}: dt {dt!r} out of range"
+        if not isinstance(bits, int) or bits & ~all_bits:
+            return f"frame {i}: bad input bits {bits!r}"
+        if bits & INPUT_REWIND:
+            # same fairness rule as stress mode: rewinding can undo every hit
+            return f"frame {i}: rewind used, not eligible"
+    return None
+
+
+def verify_submission(submission: dict, timeout: float = VERIFY_TIMEOUT) -> dict:
+    """Re-simulate a submitted replay headlessly and compare it to the claimed result.
+
+    submission = {"replay": {...}, "claim": {"score", "level", "won"}}
+    """
+    t0 = time.monotonic()
+    if not isinstance(submission, dict):
+        return {"ok": False, "reason": "submission must be a JSON object", "claim": None, "actual": None}
+    verdict = {"ok": False, "reason": "", "claim": submission.get("claim"), "actual": None}
+
+    replay = submission.get("replay")
+    claim = submission.get("claim")
+    if not isinstance(replay, dict) or not isinstance(claim, dict):
+        verdict["reason"] = "submission needs 'replay' and 'claim'"
+        return verdict
+    problem = check_replay(replay)
+    if problem:
+        verdict["reason"] = problem
+        verdict["verify_seconds"] = time.monotonic() - t0
+        return verdict
+
+    verdict["frames"] = len(replay["frames"])
+    verdict["play_seconds"] = sum(min(dt, max_frame_dt(replay["fps"])) for dt, _ in replay["frames"])
+    try:
+        result = run_game(replay=replay, realtime=False, render=False, deadline=t0 + timeout)
+    except TimeoutError as e:
+        verdict["reason"] = f"timeout: {e}"
+        verdict["verify_seconds"] = time.monotonic() - t0
+        return verdict
+
+    actual = {"score": result["score"], "level": result["level"], "won": result["won"]}
+    verdict["actual"] = actual
+    mismatched = [k for k in ("score", "level", "won") if claim.get(k) != actual[k]]
+    verdict["ok"] = not mismatched
+    verdict["reason"] = "verified" if not mismatched else "mismatch: " + ", ".join(mismatched)
+    verdict["verify_seconds"] = time.monotonic() - t0
+    return verdict
+
+
+def _init_verify_worker():
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    os.environ["SDL_NO_SIGNAL_HANDLERS"] = "1"  # SDL would turn SIGTERM into a quit event nobody reads
+    # workers fork after serve_verifier() installs its SIGTERM handler; a group-wide SIGTERM should just
+    # end them, and Ctrl+C is the parent's to handle (it shuts the pool down)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    pygame.init()
+
+
+class VerifyService:
+    """Process pool + job queue for replay verification, with throughput stats."""
+
+    def __init__(self, workers: int = 0, timeout: float = VERIFY_TIMEOUT):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_verify_worker)
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.done = 0
+        self.accepted = 0
+        self.busy_seconds = 0.0
+        self.play_seconds = 0.0
+
+    def submit(self, submission: dict):
+        return self.pool.submit(verify_submission, submission, self.timeout)
+
+    def result(self, future) -> dict:
+        try:
+            # the worker enforces the timeout itself; this only catches a hung process
+            verdict = future.result(timeout=self.timeout + 10.0)
+        except FutureTimeoutError:
+            verdict = {"ok": False, "reason": "timeout: worker did not answer"}
+        except Exception as e:  # a crashing replay must not take the service down
+            verdict = {"ok": False, "reason": f"error: {e!r}"}
+        with self.lock:
+            self.done += 1
+            self.accepted += bool(verdict["ok"])
+            self.busy_seconds += verdict.get("verify_seconds", 0.0)
+            self.play_seconds += verdict.get("play_seconds", 0.0)
+        return verdict
+
+    def stats(self) -> dict:
+        with self.lock:
+            wall = time.monotonic() - self.started
+            return {
+                "workers": self.workers,
+                "verified": self.done,
+                "accepted": self.accepted,
+                "replays_per_sec": self.done / wall if wall > 0 else 0.0,
+                "replays_per_sec_per_core": self.done / self.busy_seconds if self.busy_seconds > 0 else 0.0,
+                "speedup_vs_realtime": self.play_seconds / self.busy_seconds if self.busy_seconds > 0 else 0.0,
+            }
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+def verify_files(paths, workers: int, timeout: float) -> bool:
+    service = VerifyService(workers, timeout)
+    try:
+        futures = {service.submit(json.loads(Path(p).read_text(encoding="utf-8"))): p for p in paths}
+        all_ok = True
+        for fut in as_completed(futures):
+            verdict = service.result(fut)
+            all_ok = all_ok and verdict["ok"]
+            print(f"{'OK  ' if verdict['ok'] else 'FAIL'} {futures[fut]}: {verdict['reason']}"
+                  f" ({verdict.get('verify_seconds', 0.0):.2f}s for {verdict.get('play_seconds', 0.0):.1f}s of play)")
+        st = service.stats()
+        print(f"{st['verified']} replays, {st['accepted']} accepted | {st['replays_per_sec']:.2f} replays/s on "
+              f"{st['workers']} workers, {st['replays_per_sec_per_core']:.2f} replays/s/core, "
+              f"{st['speedup_vs_realtime']:.1f}x realtime")
+        return all_ok
+    finally:
+        service.close()
+
+
+class VerifyRequestHandler(BaseHTTPRequestHandler):
+    # POST /verify  body: submission JSON -> verdict JSON
+    # GET  /stats   -> throughput JSON
+
+    def _send_json(self, code: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, self.server.service.stats())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/verify":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            self._send_json(400, {"error": "bad Content-Length"})
+            return
+        if length <= 0 or length > VERIFY_MAX_BODY:
+            self._send_json(413, {"error": "bad body size"})
+            return
+        try:
+            submission = json.loads(self.rfile.read(length))
+        except ValueError:
+            self._send_json(400, {"error": "invalid JSON"})
+            return
+        if not isinstance(submission, dict):
+            self._send_json(400, {"error": "submission must be a JSON object"})
+            return
+        service = self.server.service
+        self._send_json(200, service.result(service.submit(submission)))
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def serve_verifier(port: int, workers: int, timeout: float):
+    server = ThreadingHTTPServer((VERIFY_HOST, port), VerifyRequestHandler)
+    server.service = VerifyService(workers, timeout)
+    print(f"Verifying replays on http://{VERIFY_HOST}:{port}/verify ({server.service.workers} workers)")
+
+    def on_sigterm(signum, frame):
+        raise KeyboardInterrupt  # same clean shutdown as Ctrl+C, so the worker pool doesn't outlive us
+
+    signal.signal(signal.SIGTERM, on_sigterm)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.close()
+
+
+def main(argv=None):
+    global FPS
+    parser = argparse.ArgumentParser(description="Tunnel Shooter")
+    parser.add_argument("--seed", type=int, help="RNG seed for a reproducible session")
+    parser.add_argument("--record", type=Path, metavar="FILE", help="record inputs to a replay file")
+    parser.add_argument("--replay", type=Path, metavar="FILE", help="play back a recorded replay")
+    parser.add_argument("--headless", action="store_true", help="use the SDL dummy video driver (no window)")
+    parser.add_argument("--fast", action="store_true", help="replay without clock.tick throttling")
+    parser.add_argument("--start-snapshot", type=Path, metavar="FILE",
+                        help="start from a saved snapshot (F5 quick-save file) instead of a fresh game")
+    parser.add_argument("--save-snapshot", type=Path, metavar="FILE",
+                        help="write the final game state as a snapshot (e.g. to benchmark from a late level)")
+    parser.add_argument("--seek", type=int, default=0, metavar="FRAME",
+                        help="replay: simulate the first FRAME frames without drawing, then play / export from there")
+    parser.add_argument("--export", metavar="TARGET",
+                        help="export replay frames: '-' = raw RGB24 on stdout, 'DIR/' or an existing directory = "
+                             "numbered PNGs, a file name with an extension or a named pipe = raw RGB24")
+    parser.add_argument("--export-workers", type=int, default=0, metavar="N",
+                        help="PNG encoder processes (default: CPU count)")
+    parser.add_argument("--fps", type=int, default=FPS, metavar="N",
+                        help=f"frame/tick rate cap (default {FPS}); collisions are swept, so low rates stay correct")
+    parser.add_argument("--renderer", choices=RENDERERS, default="batched", help="draw path (default: batched)")
+    parser.add_argument("--stress", type=int, nargs="?", const=STRESS_DEFAULT, default=1, metavar="N",
+                        help=f"bullet-hell mode: spawn rates x N, hazards from level 1 (default N={STRESS_DEFAULT})")
+    parser.add_argument("--stress-fire", type=float, default=STRESS_FIRE_DEFAULT, metavar="F",
+                        help=f"with --stress: UFO fire rate x N x F (default F={STRESS_FIRE_DEFAULT:g})")
+    parser.add_argument("--pixel-check", nargs="*", type=Path, metavar="REPLAY",
+                        help="compare renderer output frame by frame on replays (or seeded scenarios) and exit")
+    parser.add_argument("--scenarios", type=int, default=3, metavar="N",
+                        help="seeded scenarios for --pixel-check when no replay is given")
+    parser.add_argument("--scenario-frames", type=int, default=900, metavar="N")
+    parser.add_argument("--diff-dir", type=Path, default=Path("pixel_diff"), help="where divergent frames are written")
+    parser.add_argument("--verify", nargs="+", type=Path, metavar="FILE",
+                        help="verify leaderboard submissions ({'replay': ..., 'claim': ...}) and exit")
+    parser.add_argument("--serve", type=int, nargs="?", const=VERIFY_PORT, metavar="PORT",
+                        help=f"run the verification HTTP service on {VERIFY_HOST} (default port {VERIFY_PORT})")
+    parser.add_argument("--workers", type=int, default=0, metavar="N",
+                        help="verification worker processes (default: CPU count)")
+    parser.add_argument("--timeout", type=float, default=VERIFY_TIMEOUT, metavar="SEC",
+                        help="wall-time limit per verified replay")
+    args = parser.parse_args(argv)
+
+    FPS = args.fps
+    stress = StressTuning(args.stress, args.stress_fire) if args.stress > 1 else StressTuning()
+
+    if args.pixel_check is not None:
+        if np is None:
+            parser.error("--pixel-check needs numpy")
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        if args.pixel_check:
+            replays = [(p.stem, load_replay(p)) for p in args.pixel_check]
+        else:
+            replays = [(f"seed{i}", make_scenario(i, args.scenario_frames, stress,
+                                                  SCENARIO_LEVELS[i % len(SCENARIO_LEVELS)]))
+                       for i in range(args.scenarios)]
+        candidate = args.renderer if args.renderer != "reference" else "batched"
+        sys.exit(0 if run_pixel_checks(replays, candidate, args.diff_dir) else 1)
+
+    if args.verify:
+        sys.exit(0 if verify_files(args.verify, args.workers, args.timeout) else 1)
+    if args.serve is not None:
+        serve_verifier(args.serve, args.workers, args.timeout)
+        sys.exit()
+
+    if args.export and args.replay is None:
+        parser.error("--export needs --replay")
+    if args.export:
+        try:
+            export_target_kind(args.export)
+        except ValueError as e:
+            parser.error(f"--export: {e}")
+    if args.start_snapshot and args.replay is not None:
+        parser.error("--start-snapshot can't be combined with --replay (replays carry their own start state)")
+    if args.headless:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+    replay = load_replay(args.replay) if args.replay is not None else None
+    start_snapshot = load_snapshot(args.start_snapshot) if args.start_snapshot is not None else None
+    exporter = FrameExporter(args.export, args.export_workers) if args.export else None
+    try:
+        result = run_game(
+            seed=args.seed,
+            replay=replay,
+            record_path=args.record,
+            realtime=not (args.fast or args.headless or exporter is not None),
+            frame_sink=exporter,
+            renderer=args.renderer,
+            start_snapshot=start_snapshot,
+            seek=args.seek,
+            stress=stress if replay is None else None,
+        )
+    finally:
+        if exporter is not None:
+            exporter.close()
+    if args.save_snapshot is not None:
+        save_snapshot(args.save_snapshot, result["snapshot"])
+
     pygame.quit()
     sys.exit()
 
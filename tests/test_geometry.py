@@ -0,0 +1,78 @@
+# brute-force checks for the collision / corridor geometry helpers in code.py
+import importlib.util
+import random
+from pathlib import Path
+
+import pytest
+
+pygame = pytest.importorskip("pygame")
+
+# code.py can't be imported by name (it would shadow the stdlib "code" module)
+_spec = importlib.util.spec_from_file_location("tunnel_game", Path(__file__).resolve().parent.parent / "code.py")
+game = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(game)
+
+
+def random_rect(rng, max_xy=60, max_size=20):
+    return pygame.Rect(rng.randint(-max_xy, max_xy), rng.randint(-max_xy, max_xy),
+                       rng.randint(1, max_size), rng.randint(1, max_size))
+
+
+def touches_at(rect, dx, dy, target, t, eps=1e-6):
+    # rect's position t of the way along this frame's motion overlaps target (half-open pixel spans)
+    x = rect.left - dx + t * dx
+    y = rect.top - dy + t * dy
+    return (target.left - rect.width + 1 - eps <= x < target.right + eps
+            and target.top - rect.height + 1 - eps <= y < target.bottom + eps)
+
+
+def test_swept_hit_without_motion_is_colliderect():
+    rng = random.Random(1)
+    for _ in range(5000):
+        rect, target = random_rect(rng), random_rect(rng)
+        assert (game.swept_hit(rect, 0.0, 0.0, target) is not None) == bool(rect.colliderect(target))
+
+
+def test_swept_hit_matches_sampled_motion():
+    rng = random.Random(2)
+    steps = 400
+    for _ in range(3000):
+        rect, target = random_rect(rng), pygame.Rect(rng.randint(-20, 20), rng.randint(-20, 20),
+                                                     rng.randint(1, 12), rng.randint(1, 12))
+        dx = rng.choice((0.0, rng.uniform(-120, 120)))
+        dy = rng.choice((0.0, rng.uniform(-40, 40)))
+        t = game.swept_hit(rect, dx, dy, target)
+        sampled = next((i / steps for i in range(steps + 1) if touches_at(rect, dx, dy, target, i / steps, eps=0.0)),
+                       None)
+        if sampled is not None:
+            assert t is not None and t <= sampled + 1e-9
+        if t is not None:
+            assert 0.0 <= t <= 1.0
+            assert touches_at(rect, dx, dy, target, t)
+        if rect.colliderect(target):
+            assert t is not None
+
+
+def test_corridor_spans_match_brute_force():
+    rng = random.Random(3)
+    max_span = 5
+    spans = game.CorridorSpans(max_span)
+    cols = []
+    for step in range(600):
+        if step % 150 == 0:
+            spans.clear()
+            cols.clear()
+        top = rng.randint(0, 20)
+        col = (top, top + rng.randint(1, 10))
+        spans.append(col)
+        cols.append(col)
+        if len(cols) > 30 or rng.random() < 0.3:
+            spans.popleft()
+            cols.pop(0)
+
+        assert list(spans) == cols and len(spans) == len(cols) and spans[-1] == cols[-1]
+        for i0 in range(len(cols)):
+            for i1 in range(i0, min(len(cols), i0 + max_span + 2)):  # also past max_span (fallback path)
+                window = cols[i0:i1 + 1]
+                expected = (max(t for t, _ in window), min(b for _, b in window))
+                assert spans.bounds(i0, i1) == expected